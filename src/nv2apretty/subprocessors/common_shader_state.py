@@ -2,7 +2,6 @@ from __future__ import annotations
 
 # ruff: noqa: PLR2004 Magic value used in comparison
 import re
-from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 from nv2apretty.extracted_data import (
@@ -81,12 +80,13 @@ _BITVECTOR_EXPANSION_RE = re.compile(r".*\{(.+)}")
 PRIMITIVE_OP_POINTS = 1
 
 
-@dataclass
 class CommonShaderState(PipelineState):
     """Captures state that is common to both the fixed function and programmable pipelines."""
 
-    def __post_init__(self):
-        self._initialize(
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(
             {
                 NV097_DRAW_ARRAYS,
                 NV097_SET_ALPHA_FUNC,
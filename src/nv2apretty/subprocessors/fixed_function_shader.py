@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 # ruff: noqa: PLR2004 Magic value used in comparison
+import io
 import re
-from dataclasses import dataclass
+import struct
+from typing import TYPE_CHECKING
 
 from nv2apretty.extracted_data import (
     NV097_SET_BACK_LIGHT_AMBIENT_COLOR,
@@ -48,17 +50,25 @@ from nv2apretty.extracted_data import (
     NV097_SET_TEXTURE_MATRIX_ENABLE,
     NV097_SET_TWO_SIDE_LIGHT_EN,
 )
-from nv2apretty.subprocessors.pipeline_state import PipelineState, as_float
+from nv2apretty.subprocessors.pipeline_state import PipelineState
+
+if TYPE_CHECKING:
+    from typing import TextIO
 
 _LIGHT_STATUS_RE = re.compile(r".*\{(.+)}")
 
+# Reinterprets the 8 raw NV097_SET_POINT_PARAMS values as floats in a single pack/unpack.
+_POINT_PARAMS_AS_UINT32 = struct.Struct("!8I")
+_POINT_PARAMS_AS_FLOAT = struct.Struct("!8f")
+
 
-@dataclass
 class FixedFunctionPipelineState(PipelineState):
     """Represents the fixed function pipeline state of a single frame."""
 
-    def __post_init__(self):
-        self._initialize(
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(
             {
                 NV097_SET_BACK_LIGHT_AMBIENT_COLOR,
                 NV097_SET_BACK_LIGHT_DIFFUSE_COLOR,
@@ -141,81 +151,91 @@ class FixedFunctionPipelineState(PipelineState):
         return ret
 
     def __str__(self):
-        ret = []
-
-        lighting_enabled = self._get_raw_value(NV097_SET_LIGHTING_ENABLE, 0) != 0
-        two_sided_lighting = self._get_raw_value(NV097_SET_TWO_SIDE_LIGHT_EN, 0)
-        ret.append(f"Lighting: {lighting_enabled}")
+        output = io.StringIO()
+        self.write_to(output)
+        return output.getvalue()
+
+    def write_to(self, output: TextIO):
+        """Writes a human-readable description of this state to the given stream."""
+        lighting_enabled = self._get_scalar_value(NV097_SET_LIGHTING_ENABLE, 0) != 0
+        two_sided_lighting = bool(self._get_scalar_value(NV097_SET_TWO_SIDE_LIGHT_EN, 0))
+        output.write(f"\tLighting: {lighting_enabled}")
         if lighting_enabled:
-            ret.append(f"\tColor material: {self._process(NV097_SET_COLOR_MATERIAL)}")
-            ret.append(f"\tLight control: {self._process(NV097_SET_LIGHT_CONTROL)}")
-            ret.append(f"\tScene ambient: {self._process(NV097_SET_SCENE_AMBIENT_COLOR)}")
-            ret.append(f"\tMaterial emission: {self._process(NV097_SET_MATERIAL_EMISSION)}")
-            ret.append(f"\tMaterial alpha: {self._process(NV097_SET_MATERIAL_ALPHA)}")
-            ret.append(f"\tSpecular params: {self._process(NV097_SET_SPECULAR_PARAMS)}")
-
-            ret.append(f"\tTwo sided: {bool(two_sided_lighting)}")
+            output.write(f"\n\t\tColor material: {self._process(NV097_SET_COLOR_MATERIAL)}")
+            output.write(f"\n\t\tLight control: {self._process(NV097_SET_LIGHT_CONTROL)}")
+            output.write(f"\n\t\tScene ambient: {self._process(NV097_SET_SCENE_AMBIENT_COLOR)}")
+            output.write(f"\n\t\tMaterial emission: {self._process(NV097_SET_MATERIAL_EMISSION)}")
+            output.write(f"\n\t\tMaterial alpha: {self._process(NV097_SET_MATERIAL_ALPHA)}")
+            output.write(f"\n\t\tSpecular params: {self._process(NV097_SET_SPECULAR_PARAMS)}")
+
+            output.write(f"\n\t\tTwo sided: {bool(two_sided_lighting)}")
             if two_sided_lighting:
-                ret.append(f"\t\tBack scene ambient: {self._process(NV097_SET_BACK_SCENE_AMBIENT_COLOR)}")
-                ret.append(f"\t\tBack material emission: {self._process(NV097_SET_BACK_MATERIAL_EMISSION)}")
-                ret.append(f"\t\tBack material alpha: {self._process(NV097_SET_BACK_MATERIAL_ALPHA)}")
+                output.write(f"\n\t\t\tBack scene ambient: {self._process(NV097_SET_BACK_SCENE_AMBIENT_COLOR)}")
+                output.write(f"\n\t\t\tBack material emission: {self._process(NV097_SET_BACK_MATERIAL_EMISSION)}")
+                output.write(f"\n\t\t\tBack material alpha: {self._process(NV097_SET_BACK_MATERIAL_ALPHA)}")
 
-            match = _LIGHT_STATUS_RE.match(self._process(NV097_SET_LIGHT_ENABLE_MASK))
+            match = _LIGHT_STATUS_RE.match(str(self._process(NV097_SET_LIGHT_ENABLE_MASK)))
             if match:
-                ret.extend(self._expand_light_states(match.group(1), two_sided_lighting=two_sided_lighting))
+                output.writelines(
+                    f"\n\t{line}"
+                    for line in self._expand_light_states(match.group(1), two_sided_lighting=two_sided_lighting)
+                )
 
-        specular_enable = self._get_raw_value(NV097_SET_SPECULAR_ENABLE, 0)
-        ret.append(f"Specular enable: {bool(specular_enable)}")
+        specular_enable = self._get_scalar_value(NV097_SET_SPECULAR_ENABLE, 0)
+        output.write(f"\n\tSpecular enable: {bool(specular_enable)}")
         if specular_enable:
-            ret.append(f"\tSpecular params: {self._process(NV097_SET_SPECULAR_PARAMS)}")
+            output.write(f"\n\t\tSpecular params: {self._process(NV097_SET_SPECULAR_PARAMS)}")
             if two_sided_lighting:
-                ret.append(f"\tBack specular params: {self._process(NV097_SET_BACK_SPECULAR_PARAMS)}")
+                output.write(f"\n\t\tBack specular params: {self._process(NV097_SET_BACK_SPECULAR_PARAMS)}")
 
-        fog_enabled = self._get_raw_value(NV097_SET_FOG_ENABLE, 0) != 0
-        ret.append(f"Fog enable: {fog_enabled}")
+        fog_enabled = self._get_scalar_value(NV097_SET_FOG_ENABLE, 0) != 0
+        output.write(f"\n\tFog enable: {fog_enabled}")
         if fog_enabled:
-            ret.append(f"\tFog gen mode: {self._process(NV097_SET_FOG_GEN_MODE)}")
+            output.write(f"\n\t\tFog gen mode: {self._process(NV097_SET_FOG_GEN_MODE)}")
 
-        ret.append(f"Skinning mode: {self._process(NV097_SET_SKIN_MODE)}")
+        output.write(f"\n\tSkinning mode: {self._process(NV097_SET_SKIN_MODE)}")
 
-        point_params_enabled = self._get_raw_value(NV097_SET_POINT_PARAMS_ENABLE, 0) != 0
-        ret.append(f"Point params enable: {point_params_enabled}")
+        point_params_enabled = self._get_scalar_value(NV097_SET_POINT_PARAMS_ENABLE, 0) != 0
+        output.write(f"\n\tPoint params enable: {point_params_enabled}")
         if point_params_enabled:
-            ret.append(f"\tPoint size: {self._process(NV097_SET_POINT_SIZE)}")
+            output.write(f"\n\t\tPoint size: {self._process(NV097_SET_POINT_SIZE)}")
 
             params = self._get_raw_value(NV097_SET_POINT_PARAMS)
             if params:
-                point_scale_factor_a = as_float(params[0])
-                point_scale_factor_b = as_float(params[1])
-                point_scale_factor_c = as_float(params[2])
-                ret.append(
-                    f"\tSize multiplier: sqrt(1/({point_scale_factor_a} + {point_scale_factor_b} * Deye + {point_scale_factor_c} * (Deye^2))"
+                (
+                    point_scale_factor_a,
+                    point_scale_factor_b,
+                    point_scale_factor_c,
+                    point_size_range,
+                    _,
+                    _,
+                    point_scale_bias,
+                    point_min_size,
+                ) = _POINT_PARAMS_AS_FLOAT.unpack(_POINT_PARAMS_AS_UINT32.pack(*params))
+                output.write(
+                    f"\n\t\tSize multiplier: sqrt(1/({point_scale_factor_a} + {point_scale_factor_b} * Deye + {point_scale_factor_c} * (Deye^2))"
                 )
 
-                point_size_range = as_float(params[3])
-                ret.append(f"\tSize range: {point_size_range}")
-                point_scale_bias = as_float(params[6])
-                ret.append(f"\tScale bias: {point_scale_bias}")
-                point_min_size = as_float(params[7])
-                ret.append(f"\tMinimum size: {point_min_size}")
+                output.write(f"\n\t\tSize range: {point_size_range}")
+                output.write(f"\n\t\tScale bias: {point_scale_bias}")
+                output.write(f"\n\t\tMinimum size: {point_min_size}")
 
-        if bool(self._get_raw_value(NV097_SET_POINT_SMOOTH_ENABLE, 0)):
-            ret.append("Point smooth (point sprites) enabled")
+        if bool(self._get_scalar_value(NV097_SET_POINT_SMOOTH_ENABLE, 0)):
+            output.write("\n\tPoint smooth (point sprites) enabled")
 
-        ret.append("TexGen: ")
+        output.write("\n\tTexGen: ")
         s_vals = self._process(NV097_SET_TEXGEN_S)
-        t_vals = self._process(NV097_SET_TEXGEN_T)
-        r_vals = self._process(NV097_SET_TEXGEN_R)
-        q_vals = self._process(NV097_SET_TEXGEN_Q)
-        if all([s_vals, t_vals, r_vals, q_vals]):
-            ret.extend(
-                f"\tS[{i}] {s_vals[i]}, T[{i}] {t_vals[i]} R[{i}]: {r_vals[i]} Q[{i}]: {q_vals[i]}"
-                for i in range(len(s_vals))
-            )
+        if s_vals:
+            t_vals = self._process(NV097_SET_TEXGEN_T)
+            r_vals = self._process(NV097_SET_TEXGEN_R)
+            q_vals = self._process(NV097_SET_TEXGEN_Q)
+            if t_vals and r_vals and q_vals:
+                output.writelines(
+                    f"\n\t\tS[{i}] {s_vals[i]}, T[{i}] {t_vals[i]} R[{i}]: {r_vals[i]} Q[{i}]: {q_vals[i]}"
+                    for i in range(len(s_vals))
+                )
 
         tex_matrix_en = self._get_raw_value(NV097_SET_TEXTURE_MATRIX_ENABLE)
         if tex_matrix_en:
             texture_matrix_data = [f"[{index}: {bool(item)}]" for index, item in enumerate(tex_matrix_en)]
-            ret.append(f"TextureMatrix: {', '.join(texture_matrix_data)}")
-
-        return "\t" + "\n\t".join(ret)
+            output.write(f"\n\tTextureMatrix: {', '.join(texture_matrix_data)}")
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import struct
-from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any
+import copy
+import functools
+import operator
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 from nv2apretty.extracted_data import (
     CLASS_TO_COMMAND_PROCESSOR_MAP,
@@ -15,69 +16,229 @@ if TYPE_CHECKING:
     from collections.abc import Callable
 
 
-def as_float(int_val: int) -> float:
-    packed_bytes = struct.pack("!I", int_val)
-    return struct.unpack("!f", packed_bytes)[0]
+# NV20_KELVIN_PRIMITIVE graphics class.
+_KELVIN_CLASS = 0x97
 
 
-def _expand_command_map(nv_commands: set[int]) -> tuple[dict[int, int | StateArray | StructStateArray], set[int]]:
-    """Expands nv_commands into {command_address: info_struct} and {expanded command ID}."""
+def _hex_formatter(nv_param: int) -> str:
+    """Fallback for commands that have no dedicated processor."""
+    return f"0x{nv_param:X}"
 
-    command_to_info: dict[int, Any] = {}
-    expanded_commands: set[int] = set()
 
-    kelvin_ops: dict[int | StateArray | StructStateArray, Callable] = CLASS_TO_COMMAND_PROCESSOR_MAP.get(0x97, {})
-    for op_info in kelvin_ops:
-        base_op = op_info.base if isinstance(op_info, StateArray | StructStateArray) else op_info
+# Maps each NV097 command ID to its processor, pre-bound to the fixed class/op arguments so that it takes only the
+# parameter value.
+_KELVIN_FORMATTERS: dict[int, Callable[[int], str]] = {
+    nv_op: functools.partial(processor, 0, _KELVIN_CLASS)
+    for (nv_class, nv_op), processor in PROCESSORS.items()
+    if nv_class == _KELVIN_CLASS
+}
 
-        if base_op not in nv_commands:
-            continue
 
-        command_to_info[base_op] = op_info
+# Maximum number of distinct raw values whose rendered strings are memoized for each tracked command. Most state is
+# unchanged from draw to draw, so a small cache avoids re-running the (potentially expensive) processors.
+_RENDER_CACHE_SIZE = 64
 
-        if isinstance(op_info, int):
-            expanded_commands.add(op_info)
-            continue
 
-        if isinstance(op_info, StateArray):
-            for i in range(op_info.num_elements):
-                expanded_commands.add(op_info.base + i * op_info.stride)
-            continue
+class _TrackedCommand(NamedTuple):
+    """Accessors for a single tracked command, specialized for the shape of its state."""
 
-        if isinstance(op_info, StructStateArray):
-            base = op_info.base
-            for _ in range(op_info.struct_count):
-                for i in range(op_info.num_elements):
-                    expanded_commands.add(base + i * op_info.stride)
-                base += op_info.struct_stride
-            continue
+    """Returns the raw value(s) for the command from the given dense state list as a hashable value."""
+    read: Callable[[list[int | None], Any], Any]
 
-    return command_to_info, expanded_commands
+    """Converts the raw value(s) returned by `read` into display string(s)."""
+    render: Callable[[Any, str], str | list[str] | list[list[str]]]
 
 
-@dataclass
-class PipelineState:
-    """Baseclass for capture of nv2a GPU state."""
+def _allocate_slots(command_index: dict[int, int], opcodes: tuple[int, ...]) -> tuple[int, ...]:
+    """Assigns each command ID a slot in the dense state list, returning the slots in the same order."""
+    return tuple(command_index.setdefault(op, len(command_index)) for op in opcodes)
+
+
+def _make_slot_getter(indices: tuple[int, ...]) -> Callable[[list[int | None]], tuple[int | None, ...]]:
+    """Returns a function that fetches the given slots from the dense state list as a tuple."""
+    if len(indices) == 1:
+        (index,) = indices
+        return lambda state: (state[index],)
+    return operator.itemgetter(*indices)
+
+
+def _scalar_command(opcode: int, command_index: dict[int, int]) -> _TrackedCommand:
+    (index,) = _allocate_slots(command_index, (opcode,))
+
+    def read(state: list[int | None], default: Any) -> Any:
+        value = state[index]
+        return default if value is None else value
+
+    formatter = _KELVIN_FORMATTERS.get(opcode, _hex_formatter)
+
+    @functools.lru_cache(maxsize=_RENDER_CACHE_SIZE)
+    def render(raw_value: Any, default_string_value: str) -> str:
+        if raw_value is None:
+            return default_string_value
+        return formatter(raw_value)
+
+    return _TrackedCommand(read, render)
+
+
+def _state_array_command(op_info: StateArray, command_index: dict[int, int]) -> _TrackedCommand:
+    opcodes = tuple(range(op_info.base, op_info.base + op_info.num_elements * op_info.stride, op_info.stride))
+    get_values = _make_slot_getter(_allocate_slots(command_index, opcodes))
+
+    def read(state: list[int | None], default: Any) -> tuple[Any, ...] | None:
+        raw_values = get_values(state)
+        if None in raw_values:
+            if default is None:
+                return None
+            return tuple([default if value is None else value for value in raw_values])
+        return raw_values
+
+    formatters = tuple(_KELVIN_FORMATTERS.get(op, _hex_formatter) for op in opcodes)
+
+    @functools.lru_cache(maxsize=_RENDER_CACHE_SIZE)
+    def render_values(raw_value: tuple[Any, ...] | None, default_string_value: str) -> tuple[str, ...]:
+        if raw_value is None:
+            return (default_string_value,) * op_info.num_elements
+        return tuple([formatter(param) for formatter, param in zip(formatters, raw_value, strict=True)])
+
+    def render(raw_value: tuple[Any, ...] | None, default_string_value: str) -> list[str]:
+        return list(render_values(raw_value, default_string_value))
 
-    # Maps NV097 operations to a raw invocation count
-    _counter_state: dict[int, int] = field(default_factory=dict)
+    return _TrackedCommand(read, render)
 
-    # Maps NV097 operations to the most recently set parameter value
-    _state: dict[int, int] = field(default_factory=dict)
 
-    _command_to_info: dict[int, int | StateArray | StructStateArray] = field(default_factory=dict)
-    _command_filter: set[int] = field(default_factory=set)
+def _struct_state_array_command(op_info: StructStateArray, command_index: dict[int, int]) -> _TrackedCommand:
+    num_elements = op_info.num_elements
+    opcode_groups = tuple(
+        tuple(range(base, base + num_elements * op_info.stride, op_info.stride))
+        for base in range(
+            op_info.base, op_info.base + op_info.struct_count * op_info.struct_stride, op_info.struct_stride
+        )
+    )
+    get_values = _make_slot_getter(
+        _allocate_slots(command_index, tuple(op for opcodes in opcode_groups for op in opcodes))
+    )
+    group_starts = range(0, op_info.struct_count * num_elements, num_elements)
 
-    _last_draw_primitive: int | None = None
+    def read(state: list[int | None], default: Any) -> tuple[tuple[Any, ...], ...]:
+        # Fetch every field of every struct at once and split the result into per-struct groups.
+        values = get_values(state)
+        if None not in values:
+            return tuple([values[start : start + num_elements] for start in group_starts])
 
-    def _initialize(self, tracked_ops: set[int]):
-        self.command_to_info, self.command_filter = _expand_command_map(tracked_ops)
+        raw_values = []
+        for start in group_starts:
+            element_values = values[start : start + num_elements]
+            if None in element_values:
+                if default is None:
+                    element_values = (None,) * num_elements
+                else:
+                    element_values = tuple([default if value is None else value for value in element_values])
+            raw_values.append(element_values)
+
+        return tuple(raw_values)
+
+    formatter_groups = tuple(
+        tuple(_KELVIN_FORMATTERS.get(op, _hex_formatter) for op in opcodes) for opcodes in opcode_groups
+    )
+
+    @functools.lru_cache(maxsize=_RENDER_CACHE_SIZE)
+    def render_values(raw_value: tuple[tuple[Any, ...], ...], default_string_value: str) -> tuple[tuple[str, ...], ...]:
+        return tuple(
+            tuple(
+                [
+                    default_string_value if param is None else formatter(param)
+                    for formatter, param in zip(formatters, struct_element, strict=True)
+                ]
+            )
+            for formatters, struct_element in zip(formatter_groups, raw_value, strict=True)
+        )
+
+    def render(raw_value: tuple[tuple[Any, ...], ...], default_string_value: str) -> list[list[str]]:
+        return [list(struct_element) for struct_element in render_values(raw_value, default_string_value)]
+
+    return _TrackedCommand(read, render)
+
+
+@functools.cache
+def _expand_command_map(nv_commands: frozenset[int]) -> tuple[dict[int, _TrackedCommand], dict[int, int]]:
+    """Expands nv_commands into {command_address: tracked_command} and {expanded command ID: state slot}.
+
+    The result is shared by every PipelineState tracking the same commands (including copies made via copy.copy or
+    copy.deepcopy) and must not be modified.
+    """
+
+    command_to_info: dict[int, _TrackedCommand] = {}
+    command_index: dict[int, int] = {}
+
+    kelvin_ops: dict[int | StateArray | StructStateArray, Callable] = CLASS_TO_COMMAND_PROCESSOR_MAP.get(
+        _KELVIN_CLASS, {}
+    )
+    for op_info in kelvin_ops:
+        base_op = op_info.base if isinstance(op_info, StateArray | StructStateArray) else op_info
+
+        if base_op not in nv_commands:
+            continue
+
+        if isinstance(op_info, int):
+            command_to_info[base_op] = _scalar_command(op_info, command_index)
+        elif isinstance(op_info, StateArray):
+            command_to_info[base_op] = _state_array_command(op_info, command_index)
+        elif isinstance(op_info, StructStateArray):
+            command_to_info[base_op] = _struct_state_array_command(op_info, command_index)
+        else:
+            msg = f"Unsupported op_info type '{type(op_info)}'"
+            raise TypeError(msg)
+
+    return command_to_info, command_index
+
+
+class PipelineState:
+    """Baseclass for capture of nv2a GPU state."""
+
+    __slots__ = (
+        "_command_index",
+        "_command_to_info",
+        "_counter_state",
+        "_last_draw_primitive",
+        "_state",
+        "_tracked_ops",
+    )
+
+    def __init__(self, tracked_ops: set[int]):
+        # Maps NV097 operations to a raw invocation count
+        self._counter_state: dict[int, int] = {}
+
+        self._tracked_ops = frozenset(tracked_ops)
+        self._command_to_info, self._command_index = _expand_command_map(self._tracked_ops)
+
+        # The most recently set parameter value for each tracked NV097 operation, indexed by `_command_index`.
+        # Operations that have not been set are None.
+        self._state: list[int | None] = [None] * len(self._command_index)
+
+        self._last_draw_primitive: int | None = None
+
+    def __getstate__(self) -> tuple[frozenset[int], dict[int, int], list[int | None], int | None]:
+        """Captures the tracked state; the command maps hold local closures and are rebuilt on restore."""
+        return self._tracked_ops, self._counter_state, self._state, self._last_draw_primitive
+
+    def __setstate__(self, state: tuple[frozenset[int], dict[int, int], list[int | None], int | None]):
+        self._tracked_ops, self._counter_state, self._state, self._last_draw_primitive = state
+        self._command_to_info, self._command_index = _expand_command_map(self._tracked_ops)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> PipelineState:
+        """Copies the captured state while continuing to share the (immutable) cached command maps."""
+        # The shallow copy shares everything; only the mutable captured state needs to be duplicated.
+        ret = copy.copy(self)
+        memo[id(self)] = ret
+        ret._counter_state = self._counter_state.copy()  # noqa: SLF001
+        ret._state = self._state.copy()  # noqa: SLF001
+        return ret
 
     def update(self, nv_op: int, nv_param: int):
         self._counter_state[nv_op] = self._counter_state.get(nv_op, 0) + 1
-        if nv_op not in self.command_filter:
-            return
-        self._state[nv_op] = nv_param
+        index = self._command_index.get(nv_op)
+        if index is not None:
+            self._state[index] = nv_param
 
     def draw_begin(self, primitive_mode: int):
         """Should be invoked whenever a NV097_SET_BEGIN_END with a non-end parameter is processed"""
@@ -96,86 +257,30 @@ class PipelineState:
         return self._counter_state.get(opcode, 0)
 
     def _get_raw_value(self, opcode: int, default: Any | None = None) -> Any | None:
-        """Looks up a value or array of values for the given opcode, optionally expanding them into a string."""
-        op_info = self.command_to_info.get(opcode)
-
-        if op_info is None or isinstance(op_info, int):
-            return self._state.get(opcode, default)
-
-        if isinstance(op_info, StateArray):
-            raw_values = []
-            for i in range(op_info.num_elements):
-                val = self._state.get(op_info.base + i * op_info.stride, default)
-                if val is None:
-                    return None
-                raw_values.append(val)
-
-            return raw_values
-
-        if isinstance(op_info, StructStateArray):
-            raw_values = []
-            base = op_info.base
-            for _ in range(op_info.struct_count):
-                element_values: list[Any] = []
-                for i in range(op_info.num_elements):
-                    val = self._state.get(base + i * op_info.stride, default)
-                    if val is None:
-                        element_values = [None] * op_info.num_elements
-                        break
-                    element_values.append(val)
-                raw_values.append(element_values)
-                base += op_info.struct_stride
-
-            return raw_values
-
-        msg = f"Unsupported op_info type '{type(op_info)}'"
-        raise ValueError(msg)
+        """Looks up a value or array of values for the given opcode."""
+        command = self._command_to_info.get(opcode)
+        if command is None:
+            return self._get_slot_value(opcode, default)
+        return command.read(self._state, default)
+
+    def _get_slot_value(self, opcode: int, default: Any | None = None) -> Any | None:
+        """Looks up the value stored for exactly the given opcode (e.g., a single element of a StateArray)."""
+        index = self._command_index.get(opcode)
+        value = None if index is None else self._state[index]
+        return default if value is None else value
+
+    def _get_scalar_value(self, opcode: int, default: Any | None = None) -> Any | None:
+        """Looks up the value for a tracked, non-array opcode without going through its command accessors."""
+        value = self._state[self._command_index[opcode]]
+        return default if value is None else value
 
     def _process(
         self, opcode: int, default_raw_value: Any | None = None, default_string_value: str = "<UNKNOWN>"
     ) -> str | list[str] | list[list[str]]:
-        raw_value = self._get_raw_value(opcode, default_raw_value)
-        op_info = self.command_to_info.get(opcode)
-        op_type = type(op_info)
-
-        if op_info is None or op_type is int:
+        command = self._command_to_info.get(opcode)
+        if command is None:
+            raw_value = self._get_slot_value(opcode, default_raw_value)
             if raw_value is None:
                 return default_string_value
-
-            op = opcode
-            processor = PROCESSORS.get((0x97, op))
-
-            return processor(0, 0x97, raw_value) if processor else f"0x{raw_value:X}"
-
-        if isinstance(op_info, StateArray):
-            if raw_value is None:
-                return [default_string_value] * op_info.num_elements
-
-            processed_values: list[str] = []
-            for i, param in enumerate(raw_value):
-                op = op_info.base + i * op_info.stride
-                processor = PROCESSORS.get((0x97, op))
-                processed_values.append(processor(0, 0x97, param) if processor else f"0x{param:X}")
-            return processed_values
-
-        if isinstance(op_info, StructStateArray):
-            if raw_value is None:
-                return [default_string_value] * op_info.num_elements
-
-            processed_struct_values: list[list[str]] = []
-            base = op_info.base
-            for struct_element in raw_value:
-                processed_struct: list[str] = []
-                for i, param in enumerate(struct_element):
-                    op = base + i * op_info.stride
-                    if param is None:
-                        processed_struct.append(default_string_value)
-                    else:
-                        processor = PROCESSORS.get((0x97, op))
-                        processed_struct.append(processor(0, 0x97, param) if processor else f"0x{param:X}")
-                processed_struct_values.append(processed_struct)
-                base += op_info.struct_stride
-            return processed_struct_values
-
-        msg = f"Unsupported op_type '{op_type}'"
-        raise ValueError(msg)
+            return _KELVIN_FORMATTERS.get(opcode, _hex_formatter)(raw_value)
+        return command.render(command.read(self._state, default_raw_value), default_string_value)